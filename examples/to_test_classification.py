@@ -48,11 +48,14 @@ if not datafile.exists():
 
 target_name = ["Covertype"]
 
-cat_col_names = [
+wilderness_col_names = [
     "Wilderness_Area1",
     "Wilderness_Area2",
     "Wilderness_Area3",
     "Wilderness_Area4",
+]
+
+soil_type_col_names = [
     "Soil_Type1",
     "Soil_Type2",
     "Soil_Type3",
@@ -108,9 +111,45 @@ num_col_names = [
     "Horizontal_Distance_To_Fire_Points",
 ]
 
-feature_columns = num_col_names + cat_col_names + target_name
+feature_columns = (
+    num_col_names + wilderness_col_names + soil_type_col_names + target_name
+)
+
+cat_col_names = ["wilderness", "soil_type"]
 
-df = pd.read_csv(datafile, header=None, names=feature_columns)
+# parsing the gzipped csv takes seconds, so the prepared table is cached as feather when pyarrow is installed.
+# Bump the version whenever the preparation below changes, so that a stale cache is never read
+CACHE_VERSION = 1
+cachefile = BASE_DIR.joinpath(f"covtype_v{CACHE_VERSION}.feather")
+df = None
+if cachefile.exists():
+    try:
+        df = pd.read_feather(cachefile)
+    except ImportError:
+        pass
+    else:
+        if sorted(df.columns) != sorted(num_col_names + cat_col_names + target_name):
+            df = None
+if df is None:
+    # float64/int64 defaults would double the memory of the table and of every batch built from it
+    dtypes = {
+        **{col: np.float32 for col in num_col_names},
+        **{col: np.int8 for col in wilderness_col_names + soil_type_col_names},
+        **{col: np.int8 for col in target_name},
+    }
+    df = pd.read_csv(
+        datafile, header=None, names=feature_columns, dtype=dtypes, engine="c"
+    )
+    # The raw file one-hot encodes wilderness area and soil type. Collapsing them into two
+    # ordinal columns gives two embedding lookups per row instead of 44 binary categoricals
+    df["wilderness"] = df[wilderness_col_names].values.argmax(axis=1).astype(np.int32)
+    df["soil_type"] = df[soil_type_col_names].values.argmax(axis=1).astype(np.int32)
+    df.drop(columns=wilderness_col_names + soil_type_col_names, inplace=True)
+    try:
+        df.to_feather(cachefile)
+    except ImportError:
+        # without pyarrow, the csv is parsed on every run
+        pass
 # cat_col_names = []
 
 # num_col_names = [
@@ -130,6 +169,7 @@ data_config = DataConfig(
     categorical_cols=cat_col_names,
     continuous_feature_transform=None,  # "quantile_normal",
     normalize_continuous_features=False,
+    pin_memory=True,
 )
 model_config = CategoryEmbeddingModelConfig(
     task="classification",
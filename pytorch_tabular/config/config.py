@@ -77,6 +77,9 @@ class DataConfig:
             the noise is only applied for QuantileTransformer
 
         num_workers (Union[int, NoneType]): The number of workers used for data loading. For Windows always set to 0
+
+        pin_memory (bool): Whether or not to use pinned (page-locked) memory for the batches. When training on a GPU,
+            this lets the host to device copy of the next batch overlap with the computation
     """
 
     target: List[str] = field(
@@ -139,6 +142,12 @@ class DataConfig:
             "help": "The number of workers used for data loading. For windows always set to 0"
         },
     )
+    pin_memory: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether or not to use pinned (page-locked) memory for the batches. When training on a GPU, this lets the host to device copy of the next batch overlap with the computation"
+        },
+    )
 
     categorical_dim: int = field(init=False)
     continuous_dim: int = field(init=False)
@@ -215,6 +224,9 @@ class TrainerConfig:
 
         track_grad_norm (int): Track and Log Gradient Norms in the logger.
             -1 by default means no tracking. 1 for the L1 norm, 2 for L2 norm, etc.
+
+        precision (int): Full precision (32), half precision (16) or double precision (64).
+            Half precision runs the forward pass under native mixed precision (autocast) and needs a GPU
     """
 
     batch_size: int = field(
@@ -323,6 +335,13 @@ class TrainerConfig:
             "help": "Track and Log Gradient Norms in the logger. -1 by default means no tracking. 1 for the L1 norm, 2 for L2 norm, etc."
         },
     )
+    precision: int = field(
+        default=32,
+        metadata={
+            "help": "Full precision (32), half precision (16) or double precision (64). Half precision runs the forward pass under native mixed precision (autocast) and needs a GPU",
+            "choices": [16, 32, 64],
+        },
+    )
 
     def __post_init__(self):
         _validate_choices(self)
@@ -47,7 +47,9 @@ class DenseODSTBlock(nn.Sequential):
         self.input_dropout = input_dropout
 
     def forward(self, x):
+        # every layer reads the outputs of all the previous ones, so the layers have to run in sequence
         initial_features = x.shape[-1]
+        layer_outputs = []
         for layer in self:
             layer_inp = x
             if self.max_features is not None:
@@ -65,9 +67,16 @@ class DenseODSTBlock(nn.Sequential):
             if self.training and self.input_dropout:
                 layer_inp = F.dropout(layer_inp, self.input_dropout)
             h = layer(layer_inp)
-            x = torch.cat([x, h], dim=-1)
+            layer_outputs.append(h)
+            # the last layer's output is not an input to any layer
+            if len(layer_outputs) < len(self):
+                x = torch.cat([x, h], dim=-1)
 
-        outputs = x[..., initial_features:]
+        outputs = (
+            torch.cat(layer_outputs, dim=-1)
+            if len(layer_outputs) > 1
+            else layer_outputs[0]
+        )
         if not self.flatten_output:
             outputs = outputs.view(
                 *outputs.shape[:-1], self.num_layers * self.layer_dim, self.tree_dim
@@ -55,6 +55,11 @@ class NodeConfig(ModelConfig):
             For instance, threshold_init_cutoff = 0.9 will set 10% points equal to 0.0 or 1.0
             Setting this value > 1.0 will result in a margin between data points and sparse-sigmoid cutoff value
             All points will be between (0.5 - 0.5 / threshold_init_cutoff) and (0.5 + 0.5 / threshold_init_cutoff)
+        compile_forward (bool): Compiles the tree evaluation of the Oblivious Decision Tree layers using torch.compile.
+            Requires PyTorch>=2.0. Shapes that change between batches are recompiled once as dynamic shapes.
+            Beyond torch._dynamo's recompile limit, the layers silently fall back to eager mode
+        use_triton (bool): Computes the leaf weights and response of the Oblivious Decision Tree layers with a fused
+            Triton kernel during inference on GPUs, when Triton is installed. Training always uses the PyTorch implementation
         embed_categorical (bool): Flag to embed categorical columns using an Embedding Layer.
             If turned off, the categorical columns are encoded using LeaveOneOutEncoder
         embedding_dims (Union[List[int], NoneType]): The dimensions of the embedding for each categorical column as a
@@ -158,6 +163,18 @@ class NodeConfig(ModelConfig):
             """
         },
     )
+    compile_forward: bool = field(
+        default=False,
+        metadata={
+            "help": "Compiles the tree evaluation of the Oblivious Decision Tree layers using torch.compile. Requires PyTorch>=2.0. Shapes that change between batches are recompiled once as dynamic shapes. Beyond torch._dynamo's recompile limit, the layers silently fall back to eager mode"
+        },
+    )
+    use_triton: bool = field(
+        default=True,
+        metadata={
+            "help": "Computes the leaf weights and response of the Oblivious Decision Tree layers with a fused Triton kernel during inference on GPUs, when Triton is installed. Training always uses the PyTorch implementation"
+        },
+    )
     embed_categorical: bool = field(
         default=False,
         metadata={
@@ -0,0 +1,142 @@
+# Pytorch Tabular
+# Author: Manu Joseph <manujoseph@gmail.com>
+# For license information, see LICENSE.TXT
+"""Leaf weights and response of Oblivious Decision Trees, with a fused Triton kernel for inference on GPUs"""
+import torch
+
+try:
+    import triton
+    import triton.language as tl
+
+    TRITON_INSTALLED = True
+except ImportError:
+    TRITON_INSTALLED = False
+
+# the kernel keeps [BLOCK_B, 2 ** depth] leaf weights in registers
+MAX_TRITON_DEPTH = 10
+# the kernel accumulates in float32, so double precision stays on the reference implementation
+TRITON_DTYPES = (torch.float32, torch.float16, torch.bfloat16)
+
+
+def leaf_response_torch(bin_probs, leaf_responses):
+    """Reference implementation of :func:`leaf_response`"""
+    bins = torch.stack([bin_probs, 1 - bin_probs], dim=-1)
+    # ^--[batch_size, num_trees, depth, 2], approximately binary
+    # bins[..., d, i] is the weight of going to the side where bit d of the leaf index equals i
+
+    # build leaf weights as a Kronecker product over depth, starting from the most significant bit,
+    # so that the [batch_size, num_trees, depth, 2 ** depth] bin matches are never materialised
+    response_weights = bins[..., -1, :]
+    for d in range(bins.shape[-2] - 2, -1, -1):
+        response_weights = (
+            response_weights.unsqueeze(-1) * bins[..., d, :].unsqueeze(-2)
+        ).flatten(-2)
+    # ^-- [batch_size, num_trees, 2 ** depth]
+
+    # batched over trees, so that the GEMM reads the response in place
+    response = torch.matmul(
+        response_weights.transpose(0, 1), leaf_responses.transpose(1, 2)
+    ).transpose(0, 1)
+    # ^-- [batch_size, num_trees, tree_dim]
+    return response
+
+
+if TRITON_INSTALLED:
+
+    @triton.jit
+    def _leaf_response_kernel(
+        bin_probs_ptr,
+        leaf_responses_ptr,
+        out_ptr,
+        batch_size,
+        num_trees,
+        DEPTH: tl.constexpr,
+        NUM_LEAVES: tl.constexpr,
+        TREE_DIM: tl.constexpr,
+        BLOCK_B: tl.constexpr,
+    ):
+        # one program per (block of samples, tree)
+        tree = tl.program_id(1)
+        rows = (tl.program_id(0) * BLOCK_B + tl.arange(0, BLOCK_B)).to(tl.int64)
+        row_mask = rows < batch_size
+        leaves = tl.arange(0, NUM_LEAVES)
+
+        weights = tl.full((BLOCK_B, NUM_LEAVES), 1.0, dtype=tl.float32)
+        for d in tl.static_range(DEPTH):
+            p = tl.load(
+                bin_probs_ptr + (rows * num_trees + tree) * DEPTH + d,
+                mask=row_mask,
+                other=0.0,
+            ).to(tl.float32)
+            bit = (leaves >> d) & 1
+            weights *= tl.where(bit[None, :] == 0, p[:, None], 1.0 - p[:, None])
+
+        for c in tl.static_range(TREE_DIM):
+            response = tl.load(
+                leaf_responses_ptr + (tree * TREE_DIM + c) * NUM_LEAVES + leaves
+            ).to(tl.float32)
+            tl.store(
+                out_ptr + (rows * num_trees + tree) * TREE_DIM + c,
+                tl.sum(weights * response[None, :], axis=1),
+                mask=row_mask,
+            )
+
+
+def leaf_response_triton(bin_probs, leaf_responses):
+    """Forward of :func:`leaf_response` without materialising the leaf weights"""
+    bin_probs, leaf_responses = bin_probs.contiguous(), leaf_responses.contiguous()
+    batch_size, num_trees, depth = bin_probs.shape
+    tree_dim = leaf_responses.shape[1]
+    out = torch.empty(
+        batch_size,
+        num_trees,
+        tree_dim,
+        dtype=torch.promote_types(bin_probs.dtype, leaf_responses.dtype),
+        device=bin_probs.device,
+    )
+    block_b = max(1, min(64, 4096 >> depth))
+    grid = (triton.cdiv(batch_size, block_b), num_trees)
+    _leaf_response_kernel[grid](
+        bin_probs,
+        leaf_responses,
+        out,
+        batch_size,
+        num_trees,
+        DEPTH=depth,
+        NUM_LEAVES=2 ** depth,
+        TREE_DIM=tree_dim,
+        BLOCK_B=block_b,
+    )
+    return out
+
+
+def _is_compiling():
+    compiler = getattr(torch, "compiler", None)
+    return hasattr(compiler, "is_compiling") and compiler.is_compiling()
+
+
+def leaf_response(bin_probs, leaf_responses, use_triton=True):
+    """Response of every tree, given the probability of taking the zero bit at every depth
+
+    :param bin_probs: [batch_size, num_trees, depth] tensor
+    :param leaf_responses: [num_trees, tree_dim, 2 ** depth] tensor
+    :param use_triton: if False, the reference implementation is always used
+    :returns: [batch_size, num_trees, tree_dim] tensor
+    Uses the fused Triton kernel for CUDA tensors of up to single precision when Triton is installed
+    and no gradient is needed. The kernel has no backward, so training stays on the reference implementation
+    """
+    if (
+        use_triton
+        and TRITON_INSTALLED
+        and bin_probs.is_cuda
+        and bin_probs.shape[-1] <= MAX_TRITON_DEPTH
+        and bin_probs.dtype in TRITON_DTYPES
+        and leaf_responses.dtype in TRITON_DTYPES
+        and not _is_compiling()
+        and not (
+            torch.is_grad_enabled()
+            and (bin_probs.requires_grad or leaf_responses.requires_grad)
+        )
+    ):
+        return leaf_response_triton(bin_probs, leaf_responses)
+    return leaf_response_torch(bin_probs, leaf_responses)
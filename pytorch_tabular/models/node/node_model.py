@@ -45,6 +45,8 @@ class NODEBackbone(pl.LightningModule):
             ),
             threshold_init_beta=self.hparams.threshold_init_beta,
             threshold_init_cutoff=self.hparams.threshold_init_cutoff,
+            compile_forward=self.hparams.compile_forward,
+            use_triton=self.hparams.use_triton,
         )
         self.output_dim = (
             self.hparams.output_dim + self.hparams.additional_tree_output_dim
@@ -9,11 +9,14 @@ import numpy as np
 import torch
 import torch.nn as nn
 
+from .node_forest_fwd import leaf_response
 from .utils import ModuleWithInit, sparsemax, sparsemoid
 
 
 def check_numpy(x):
-    """Makes sure x is a numpy array"""
+    """Makes sure x is a numpy array
+    Not used by ODST anymore (initialization stays on the device), kept for external callers
+    """
     if isinstance(x, torch.Tensor):
         x = x.detach().cpu().numpy()
     x = np.asarray(x)
@@ -21,7 +24,66 @@ def check_numpy(x):
     return x
 
 
+def _row_quantiles(values, q):
+    """Quantiles of every row of a [num_rows, num_samples] tensor, each at its own level.
+    Interpolates linearly between order statistics, like np.percentile
+    :param q: [num_rows] tensor of quantile levels in [0, 1]
+    """
+    # sorting along the contiguous last dim
+    sorted_values, _ = torch.sort(values, dim=-1)
+    positions = q.view(-1, 1) * (values.shape[-1] - 1)
+    lower = positions.floor()
+    return torch.lerp(
+        sorted_values.gather(1, lower.long()),
+        sorted_values.gather(1, positions.ceil().long()),
+        (positions - lower).to(values.dtype),
+    ).squeeze(1)
+
+
+def _odst_forward(
+    input,
+    feature_selectors,
+    feature_thresholds,
+    inv_temperatures,
+    leaf_responses,
+    bin_function,
+    use_triton=True,
+):
+    """Tree evaluation part of ODST.forward, kept free of module state so it can be compiled"""
+    feature_values = torch.mm(input, feature_selectors.flatten(0, 1).t()).view(
+        input.shape[0], *feature_thresholds.shape
+    )
+    # ^--[batch_size, num_trees, depth]
+
+    threshold_logits = (feature_values - feature_thresholds) * inv_temperatures
+
+    # bin_function(-x) == 1 - bin_function(x), so it is evaluated on one side only
+    bin_probs = bin_function(threshold_logits)
+    # ^--[batch_size, num_trees, depth]
+
+    response = leaf_response(bin_probs, leaf_responses, use_triton=use_triton)
+    # ^-- [batch_size, num_trees, tree_dim]
+    return response
+
+
+# shared by all layers: Dynamo caches compiled graphs per code object anyway, and with automatic
+# dynamic shapes the batch size and input width of the layers do not pile up recompilations
+_compiled_odst_forward = None
+
+
+def _get_compiled_odst_forward():
+    global _compiled_odst_forward
+    if _compiled_odst_forward is None:
+        if not hasattr(torch, "compile"):
+            raise RuntimeError("compile_forward requires PyTorch>=2.0")
+        _compiled_odst_forward = torch.compile(_odst_forward, dynamic=None)
+    return _compiled_odst_forward
+
+
 class ODST(ModuleWithInit):
+    # version 2: feature_selection_logits are stored as [num_trees, depth, in_features]
+    _version = 2
+
     def __init__(
         self,
         in_features,
@@ -35,6 +97,8 @@ class ODST(ModuleWithInit):
         initialize_selection_logits_=nn.init.uniform_,
         threshold_init_beta=1.0,
         threshold_init_cutoff=1.0,
+        compile_forward=False,
+        use_triton=True,
     ):
         """
         Oblivious Differentiable Sparsemax Trees. http://tinyurl.com/odst-readmore
@@ -46,7 +110,8 @@ class ODST(ModuleWithInit):
         :param flatten_output: if False, returns [..., num_trees, tree_dim],
             by default returns [..., num_trees * tree_dim]
         :param choice_function: f(tensor, dim) -> R_simplex computes feature weights s.t. f(tensor, dim).sum(dim) == 1
-        :param bin_function: f(tensor) -> R[0, 1], computes tree leaf weights
+        :param bin_function: f(tensor) -> R[0, 1], computes tree leaf weights.
+            Must be symmetric around zero, i.e. f(-x) == 1 - f(x) (true for sparsemoid and entmoid15)
 
         :param initialize_response_: in-place initializer for tree output tensor
         :param initialize_selection_logits_: in-place initializer for logits that select features for the tree
@@ -65,6 +130,12 @@ class ODST(ModuleWithInit):
             For instance, threshold_init_cutoff = 0.9 will set 10% points equal to 0.0 or 1.0
             Setting this value > 1.0 will result in a margin between data points and sparse-sigmoid cutoff value
             All points will be between (0.5 - 0.5 / threshold_init_cutoff) and (0.5 + 0.5 / threshold_init_cutoff)
+
+        :param compile_forward: if True, the tree evaluation is compiled with torch.compile (PyTorch>=2.0)
+            on the first call. Shapes that change between calls (batch size, input width) are recompiled once as
+            dynamic shapes. Beyond torch._dynamo's recompile limit, it silently falls back to eager mode
+        :param use_triton: if True, inference on CUDA tensors computes the leaf weights and response with
+            a fused Triton kernel, when Triton is installed. Training always uses the PyTorch implementation
         """
         super().__init__()
         self.depth, self.num_trees, self.tree_dim, self.flatten_output = (
@@ -74,6 +145,7 @@ class ODST(ModuleWithInit):
             flatten_output,
         )
         self.choice_function, self.bin_function = choice_function, bin_function
+        self.compile_forward, self.use_triton = compile_forward, use_triton
         self.threshold_init_beta, self.threshold_init_cutoff = (
             threshold_init_beta,
             threshold_init_cutoff,
@@ -85,7 +157,7 @@ class ODST(ModuleWithInit):
         initialize_response_(self.response)
 
         self.feature_selection_logits = nn.Parameter(
-            torch.zeros([in_features, num_trees, depth]), requires_grad=True
+            torch.zeros([num_trees, depth, in_features]), requires_grad=True
         )
         initialize_selection_logits_(self.feature_selection_logits)
 
@@ -97,53 +169,61 @@ class ODST(ModuleWithInit):
             torch.full([num_trees, depth], float("nan"), dtype=torch.float32),
             requires_grad=True,
         )
+        # feature selectors and inverse temperatures are reused across inference batches
+        # until the underlying parameters change
+        self._cached_tree_params, self._cached_tree_params_key = None, None
 
-        # binary codes for mapping between 1-hot vectors and bin indices
-        with torch.no_grad():
-            indices = torch.arange(2 ** self.depth)
-            offsets = 2 ** torch.arange(self.depth)
-            bin_codes = (indices.view(1, -1) // offsets.view(-1, 1) % 2).to(
-                torch.float32
-            )
-            bin_codes_1hot = torch.stack([bin_codes, 1.0 - bin_codes], dim=-1)
-            self.bin_codes_1hot = nn.Parameter(bin_codes_1hot, requires_grad=False)
-            # ^-- [depth, 2 ** depth, 2]
-
-    def forward(self, input):
-        assert len(input.shape) >= 2
-        if len(input.shape) > 2:
-            return self.forward(input.view(-1, input.shape[-1])).view(
-                *input.shape[:-1], -1
-            )
-        # new input shape: [batch_size, in_features]
-
-        feature_logits = self.feature_selection_logits
-        feature_selectors = self.choice_function(feature_logits, dim=0)
-        # ^--[in_features, num_trees, depth]
+    def train(self, mode=True):
+        self._cached_tree_params, self._cached_tree_params_key = None, None
+        return super().train(mode)
 
-        feature_values = torch.einsum("bi,ind->bnd", input, feature_selectors)
-        # ^--[batch_size, num_trees, depth]
-
-        threshold_logits = (feature_values - self.feature_thresholds) * torch.exp(
-            -self.log_temperatures
+    def _tree_params_key(self):
+        return tuple(
+            (param._version, param.data_ptr())
+            for param in (self.feature_selection_logits, self.log_temperatures)
         )
 
-        threshold_logits = torch.stack([-threshold_logits, threshold_logits], dim=-1)
-        # ^--[batch_size, num_trees, depth, 2]
-
-        bins = self.bin_function(threshold_logits)
-        # ^--[batch_size, num_trees, depth, 2], approximately binary
+    def _get_tree_params(self):
+        if not (self.training or torch.is_grad_enabled()):
+            if self._cached_tree_params_key == self._tree_params_key():
+                return self._cached_tree_params
+        feature_selectors = self.choice_function(self.feature_selection_logits, dim=-1)
+        # ^--[num_trees, depth, in_features]
+        inv_temperatures = torch.exp(-self.log_temperatures)
+        # ^--[num_trees, depth]
+        if not (self.training or torch.is_grad_enabled()):
+            # sparsemax shifts the logits in-place, so the key is taken after computing
+            self._cached_tree_params = feature_selectors, inv_temperatures
+            self._cached_tree_params_key = self._tree_params_key()
+        return feature_selectors, inv_temperatures
 
-        bin_matches = torch.einsum("btds,dcs->btdc", bins, self.bin_codes_1hot)
-        # ^--[batch_size, num_trees, depth, 2 ** depth]
+    def forward(self, input):
+        assert len(input.shape) >= 2
+        # leading dims are flattened into the batch (a no-op for 2-D inputs),
+        # reshaping copies only when the input cannot be viewed that way
+        batch_shape = input.shape[:-1]
+        input = input.flatten(0, -2)
+        # ^--[batch_size, in_features]
 
-        response_weights = torch.prod(bin_matches, dim=-2)
-        # ^-- [batch_size, num_trees, 2 ** depth]
+        feature_selectors, inv_temperatures = self._get_tree_params()
 
-        response = torch.einsum("bnd,ncd->bnc", response_weights, self.response)
+        forward_impl = _odst_forward
+        if self.compile_forward:
+            forward_impl = _get_compiled_odst_forward()
+        response = forward_impl(
+            input,
+            feature_selectors,
+            self.feature_thresholds,
+            inv_temperatures,
+            self.response,
+            self.bin_function,
+            self.use_triton,
+        )
         # ^-- [batch_size, num_trees, tree_dim]
 
-        return response.flatten(1, 2) if self.flatten_output else response
+        if self.flatten_output:
+            response = response.flatten(1, 2)
+        return response.view(*batch_shape, *response.shape[1:])
 
     def initialize(self, input, eps=1e-6):
         # data-aware initializer
@@ -156,11 +236,14 @@ class ODST(ModuleWithInit):
             )
         with torch.no_grad():
             feature_selectors = self.choice_function(
-                self.feature_selection_logits, dim=0
+                self.feature_selection_logits, dim=-1
             )
-            # ^--[in_features, num_trees, depth]
+            # ^--[num_trees, depth, in_features]
 
-            feature_values = torch.einsum("bi,ind->bnd", input, feature_selectors)
+            # under mixed precision, the quantiles are still taken in the dtype of the parameters
+            feature_values = torch.einsum("bi,ndi->bnd", input, feature_selectors).to(
+                self.feature_thresholds.dtype
+            )
             # ^--[batch_size, num_trees, depth]
 
             # initialize thresholds: sample random percentiles of data
@@ -169,35 +252,45 @@ class ODST(ModuleWithInit):
                 self.threshold_init_beta,
                 size=[self.num_trees, self.depth],
             )
-            self.feature_thresholds.data[...] = torch.as_tensor(
-                list(
-                    map(
-                        np.percentile,
-                        check_numpy(feature_values.flatten(1, 2).t()),
-                        percentiles_q.flatten(),
-                    )
-                ),
-                dtype=feature_values.dtype,
-                device=feature_values.device,
+            self.feature_thresholds.data[...] = _row_quantiles(
+                feature_values.permute(1, 2, 0).reshape(-1, input.shape[0]),
+                torch.as_tensor(percentiles_q.flatten() / 100, device=input.device),
             ).view(self.num_trees, self.depth)
 
             # init temperatures: make sure enough data points are in the linear region of sparse-sigmoid
-            temperatures = np.percentile(
-                check_numpy(abs(feature_values - self.feature_thresholds)),
-                q=100 * min(1.0, self.threshold_init_cutoff),
-                axis=0,
-            )
+            temperatures = _row_quantiles(
+                abs(feature_values - self.feature_thresholds)
+                .permute(1, 2, 0)
+                .reshape(-1, input.shape[0]),
+                torch.full(
+                    [self.num_trees * self.depth],
+                    min(1.0, self.threshold_init_cutoff),
+                    device=input.device,
+                ),
+            ).view(self.num_trees, self.depth)
 
             # if threshold_init_cutoff > 1, scale everything down by it
             temperatures /= max(1.0, self.threshold_init_cutoff)
-            self.log_temperatures.data[...] = torch.log(
-                torch.as_tensor(temperatures) + eps
-            )
+            self.log_temperatures.data[...] = torch.log(temperatures + eps)
+
+    def _load_from_state_dict(
+        self, state_dict, prefix, local_metadata, *args, **kwargs
+    ):
+        # bin codes used to be stored as a frozen parameter; they are no longer needed
+        state_dict.pop(prefix + "bin_codes_1hot", None)
+        version = local_metadata.get("version", None)
+        logits_key = prefix + "feature_selection_logits"
+        if (version is None or version < 2) and logits_key in state_dict:
+            # older versions stored the logits as [in_features, num_trees, depth]
+            state_dict[logits_key] = state_dict[logits_key].permute(1, 2, 0)
+        super()._load_from_state_dict(
+            state_dict, prefix, local_metadata, *args, **kwargs
+        )
 
     def __repr__(self):
         return "{}(in_features={}, num_trees={}, depth={}, tree_dim={}, flatten_output={})".format(
             self.__class__.__name__,
-            self.feature_selection_logits.shape[0],
+            self.feature_selection_logits.shape[-1],
             self.num_trees,
             self.depth,
             self.tree_dim,
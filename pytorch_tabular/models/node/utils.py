@@ -102,11 +102,12 @@ def sparsemax(input, dim=-1):
 
 
 def sparsemoid(input):
-    return (0.5 * input + 0.5).clamp_(0, 1)
+    # scaled, shifted and clipped in a single output buffer
+    return input.mul(0.5).add_(0.5).clamp_(0, 1)
 
 
 # sparsemax = lambda input, dim=-1: SparsemaxFunction.apply(input, dim)
-# sparsemoid = lambda input: (0.5 * input + 0.5).clamp_(0, 1)
+# sparsemoid = lambda input: input.mul(0.5).add_(0.5).clamp_(0, 1)
 
 
 class Entmax15Function(Function):
@@ -214,8 +215,8 @@ class ModuleWithInit(nn.Module):
 
     def __init__(self):
         super().__init__()
-        self._is_initialized_tensor = nn.Parameter(
-            torch.tensor(0, dtype=torch.uint8), requires_grad=False
+        self.register_buffer(
+            "_is_initialized_tensor", torch.tensor(0, dtype=torch.uint8)
         )
         self._is_initialized_bool = None
         # Note: this module uses a separate flag self._is_initialized so as to achieve both
@@ -465,6 +465,7 @@ class TabularDatamodule(pl.LightningDataModule):
             shuffle=True if self.train_sampler is None else False,
             num_workers=self.config.num_workers,
             sampler=self.train_sampler,
+            pin_memory=self.config.pin_memory,
         )
 
     def val_dataloader(self) -> DataLoader:
@@ -478,7 +479,11 @@ class TabularDatamodule(pl.LightningDataModule):
             target=self.target,
         )
         return DataLoader(
-            dataset, self.batch_size, shuffle=False, num_workers=self.config.num_workers
+            dataset,
+            self.batch_size,
+            shuffle=False,
+            num_workers=self.config.num_workers,
+            pin_memory=self.config.pin_memory,
         )
 
     def test_dataloader(self) -> DataLoader:
@@ -497,6 +502,7 @@ class TabularDatamodule(pl.LightningDataModule):
                 self.batch_size,
                 shuffle=False,
                 num_workers=self.config.num_workers,
+                pin_memory=self.config.pin_memory,
             )
 
     def prepare_inference_dataloader(self, df: pd.DataFrame) -> DataLoader:
@@ -533,6 +539,7 @@ class TabularDatamodule(pl.LightningDataModule):
             self.batch_size,
             shuffle=False,
             num_workers=self.config.num_workers,
+            pin_memory=self.config.pin_memory,
         )
 
 
@@ -33,6 +33,7 @@ from pytorch_tabular.tabular_datamodule import TabularDatamodule
 logger = logging.getLogger(__name__)
 
 TRAINER_GPUS = "gpus"
+TRAINER_PRECISION = "precision"
 
 class TabularModel:
     def __init__(
@@ -327,9 +328,10 @@ class TabularModel:
         trainer_args_config = {
             k: v for k, v in self.config.items() if k in trainer_args
         }
-        # "gpus" not included in vars by default
-        if TRAINER_GPUS not in trainer_args_config and TRAINER_GPUS in self.config:
-            trainer_args_config[TRAINER_GPUS] = self.config[TRAINER_GPUS]
+        # "gpus" and "precision" not included in vars by default
+        for arg in [TRAINER_GPUS, TRAINER_PRECISION]:
+            if arg not in trainer_args_config and arg in self.config:
+                trainer_args_config[arg] = self.config[arg]
         # For some weird reason, checkpoint_callback is not appearing in the Trainer vars
         trainer_args_config["checkpoint_callback"] = self.config.checkpoint_callback
         self.trainer = pl.Trainer(
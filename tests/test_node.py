@@ -1,11 +1,22 @@
 #!/usr/bin/env python
 """Tests for `pytorch_tabular` package."""
+import copy
+
+import numpy as np
 import pytest
+import torch
 
 from pytorch_tabular import TabularModel
 from pytorch_tabular.categorical_encoders import CategoricalEmbeddingTransformer
 from pytorch_tabular.config import DataConfig, OptimizerConfig, TrainerConfig
 from pytorch_tabular.models import NodeConfig
+from pytorch_tabular.models.node.node_forest_fwd import (
+    TRITON_INSTALLED,
+    leaf_response,
+    leaf_response_torch,
+    leaf_response_triton,
+)
+from pytorch_tabular.models.node.odst import ODST, _row_quantiles
 
 
 @pytest.mark.parametrize("multi_target", [True, False])
@@ -194,6 +205,147 @@ def test_embedding_transformer(regression_data):
     )
 
 
+@pytest.fixture
+def initialized_odst(request):
+    """ODST with 8 trees over 5 features, initialized on its 1024-row input. Depth 3 unless parametrized"""
+    torch.manual_seed(42)
+    odst = ODST(
+        in_features=5,
+        num_trees=8,
+        depth=getattr(request, "param", 3),
+        tree_output_dim=2,
+    )
+    x = torch.randn(1024, 5)
+    with torch.no_grad():
+        odst(x)  # data-aware initialization
+    return odst, x
+
+
+@pytest.mark.parametrize("initialized_odst", [1, 3, 6], indirect=True)
+def test_odst_leaf_weights(initialized_odst):
+    odst, x = initialized_odst
+    depth = odst.depth
+    with torch.no_grad():
+        output = odst(x)
+        # reference: leaf k takes the bin selected by bit d of k at every depth d
+        feature_selectors = odst.choice_function(odst.feature_selection_logits, dim=-1)
+        threshold_logits = (
+            torch.einsum("bi,ndi->bnd", x, feature_selectors) - odst.feature_thresholds
+        ) * torch.exp(-odst.log_temperatures)
+        bins = odst.bin_function(
+            torch.stack([-threshold_logits, threshold_logits], dim=-1)
+        )
+        bin_bits = (
+            torch.arange(2 ** depth).view(1, -1) >> torch.arange(depth).view(-1, 1)
+        ) & 1
+        response_weights = bins.gather(
+            -1, (1 - bin_bits).expand(*bins.shape[:2], -1, -1)
+        ).prod(dim=-2)
+        expected = torch.einsum("bnd,ncd->bnc", response_weights, odst.response)
+    assert torch.allclose(output, expected.flatten(1, 2), atol=1e-6)
+    with torch.no_grad():
+        assert odst(x[:0]).shape == (0, 16)
+
+
+def test_odst_eval_tree_params_cache(initialized_odst):
+    odst, x = initialized_odst
+    other_odst = copy.deepcopy(odst)
+    with torch.no_grad():
+        other_odst.feature_selection_logits.add_(
+            torch.randn_like(other_odst.feature_selection_logits)
+        )
+        other_output = other_odst(x)
+        odst.eval()
+        output = odst(x)
+        cached_tree_params = odst._cached_tree_params
+        assert torch.equal(odst(x), output)
+        assert odst._cached_tree_params is cached_tree_params
+
+        # in-place updates of the logits invalidate the cache
+        odst.feature_selection_logits.add_(
+            torch.randn_like(odst.feature_selection_logits)
+        )
+        updated_output = odst(x)
+        assert odst._cached_tree_params is not cached_tree_params
+        assert not torch.allclose(updated_output, output)
+        odst.train()
+        assert torch.allclose(updated_output, odst(x))
+
+        # and so does loading a state dict
+        odst.eval()
+        odst(x)
+        odst.load_state_dict(other_odst.state_dict())
+        assert torch.allclose(odst(x), other_output)
+
+
+@pytest.mark.parametrize("version", [None, 1])
+def test_odst_load_legacy_state_dict(initialized_odst, version):
+    odst, x = initialized_odst
+    with torch.no_grad():
+        expected = odst(x)
+    # checkpoints before version 2 stored the logits as [in_features, num_trees, depth]
+    # and the binary codes of the leaves as a frozen parameter
+    state_dict = odst.state_dict()
+    state_dict["feature_selection_logits"] = state_dict[
+        "feature_selection_logits"
+    ].permute(2, 0, 1)
+    bin_codes = (
+        torch.arange(2 ** odst.depth).view(1, -1)
+        // (2 ** torch.arange(odst.depth)).view(-1, 1)
+        % 2
+    ).float()
+    state_dict["bin_codes_1hot"] = torch.stack([bin_codes, 1.0 - bin_codes], dim=-1)
+    if version is None:
+        del state_dict._metadata[""]["version"]
+    else:
+        state_dict._metadata[""]["version"] = version
+
+    legacy_odst = ODST(in_features=5, num_trees=8, depth=odst.depth, tree_output_dim=2)
+    legacy_odst.load_state_dict(state_dict)
+    with torch.no_grad():
+        output = legacy_odst(x)
+    assert torch.allclose(output, expected)
+
+
+@pytest.mark.parametrize("num_samples", [1, 2, 101])
+def test_row_quantiles(num_samples):
+    torch.manual_seed(42)
+    values = torch.randn(6, num_samples, dtype=torch.float64)
+    q = torch.tensor([0.0, 1.0, 0.5, 0.1, 0.37, 0.999], dtype=torch.float64)
+    expected = [
+        np.percentile(row, level * 100) for row, level in zip(values.numpy(), q.numpy())
+    ]
+    assert np.allclose(_row_quantiles(values, q).numpy(), expected)
+
+
+@pytest.mark.skipif(
+    not (TRITON_INSTALLED and torch.cuda.is_available()),
+    reason="needs Triton and a GPU",
+)
+@pytest.mark.parametrize("depth", [1, 4, 6])
+def test_leaf_response_triton(depth):
+    torch.manual_seed(42)
+    bin_probs = torch.rand(100, 16, depth, device="cuda")
+    leaf_responses = torch.randn(16, 3, 2 ** depth, device="cuda")
+    expected = leaf_response_torch(bin_probs, leaf_responses)
+    assert torch.allclose(
+        leaf_response_triton(bin_probs, leaf_responses), expected, atol=1e-5
+    )
+    assert torch.allclose(leaf_response(bin_probs, leaf_responses), expected, atol=1e-5)
+    # the kernel has no backward, so it is only used when no gradient is needed
+    leaf_responses.requires_grad_()
+    output = leaf_response(bin_probs, leaf_responses)
+    assert output.requires_grad
+    assert torch.equal(output, leaf_response_torch(bin_probs, leaf_responses))
+    # the kernel computes in float32, so double precision must not be dispatched to it
+    with torch.no_grad():
+        bin_probs, leaf_responses = bin_probs.double(), leaf_responses.double()
+        assert torch.equal(
+            leaf_response(bin_probs, leaf_responses),
+            leaf_response_torch(bin_probs, leaf_responses),
+        )
+
+
 # import numpy as np
 # import pandas as pd
 # from sklearn.datasets import fetch_california_housing, fetch_covtype